@@ -0,0 +1,26 @@
+# Generated by Django 5.2.17 on 2026-08-26 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='repository',
+            name='url',
+            field=models.URLField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='analysis',
+            index=models.Index(fields=['repository', '-created_at'], name='analyzer_an_reposit_cce90a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['repository_url', 'status', '-updated_at'], name='analyzer_jo_reposit_de43d2_idx'),
+        ),
+    ]
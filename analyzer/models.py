@@ -2,7 +2,7 @@ from django.db import models
 
 
 class Repository(models.Model):
-    url = models.URLField()
+    url = models.URLField(db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
 
@@ -10,3 +10,34 @@ class Analysis(models.Model):
     repository = models.ForeignKey(Repository, on_delete=models.CASCADE)
     recommendations = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['repository', '-created_at']),
+        ]
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    repository_url = models.URLField()
+    assignment_description = models.TextField()
+    candidate_level = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['repository_url', 'status', '-updated_at']),
+        ]
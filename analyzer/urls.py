@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import home
+from .views import home, job_stream, job_results
 
 urlpatterns = [
     path('', home, name='home'),
+    path('stream/<int:job_id>/', job_stream, name='job_stream'),
+    path('results/<int:job_id>/', job_results, name='job_results'),
 ]
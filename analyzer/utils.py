@@ -1,40 +0,0 @@
-import os
-
-from git import Repo
-
-
-def analyze_repository(repo_url):
-    """
-    Analyze the given repository and generate recommendations.
-
-    This function clones the repository from the provided URL and performs 
-    an analysis to generate recommendations based on the code present in 
-    the repository.
-
-    Args:
-        repo_url (str): The URL of the GitHub repository to be analyzed.
-
-    Returns:
-        str: A string containing recommendations based on the analysis.
-    """
-    local_path = clone_repository(repo_url)
-    recommendations = "Your recommendations here."
-    return recommendations
-
-def clone_repository(repo_url):
-    """
-    Clone a GitHub repository to a local path.
-
-    This function checks if the repository already exists at the local path. 
-    If it does not exist, it clones the repository from the provided URL.
-
-    Args:
-        repo_url (str): The URL of the GitHub repository to clone.
-
-    Returns:
-        str: The local path where the repository is cloned.
-    """
-    local_path = repo_url.split("/")[-1]
-    if not os.path.exists(local_path):
-        Repo.clone_from(repo_url, local_path)
-    return local_path
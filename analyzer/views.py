@@ -1,143 +1,945 @@
 import os
+import json
+import time
+import shutil
+import hashlib
 import logging
+import random
 import asyncio
+import tarfile
+import itertools
 import traceback
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 
+import aiofiles
 import httpx
-from git import Repo
-from django.shortcuts import render
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
 
 from .forms import RepositoryForm
+from .models import Analysis, Job, Repository
 
 
+# Maximum number of files analyzed concurrently; keeps the OpenAI API happy
+# while still overlapping the HTTP round-trips for every file.
+MAX_CONCURRENT_ANALYSES = 8
+
+# Total code size allowed in one batched prompt. Roughly 6k tokens at the
+# usual ~4 characters per token, leaving headroom for the prompt prefix
+# and the model's reply within the context window.
+BATCH_CHAR_BUDGET = 24_000
+
+OPENAI_MODEL = "gpt-4-turbo"
+
+# Hard ceiling on `max_tokens` in one request; gpt-4-turbo rejects anything
+# above its 4096-token completion cap with a 400, which is not retryable.
+MAX_COMPLETION_TOKENS = 4_096
+
+# How long a finished per-file analysis stays in the cache (one day).
+ANALYSIS_CACHE_TTL = 86_400
+
+# Seconds to wait for a git clone before giving up on the repository.
+CLONE_TIMEOUT = 120
+
+# How long an existing checkout is trusted before it is refreshed with
+# a fetch, so a stale checkout cannot serve outdated code.
+CLONE_REUSE_TTL = 300
+
+# How long the per-repository clone lock may stay held before it expires on
+# its own (a safety net if the holder dies mid-clone), and how often a
+# waiting request checks whether the holder has finished.
+CLONE_LOCK_TTL = 300
+CLONE_LOCK_POLL = 0.5
+
+# Directory that holds every repository checkout, so the eviction sweep can
+# scan it without touching anything else in /tmp.
+CLONE_ROOT = "/tmp/analyzer-repos"
+
+# Checkouts whose last clone or refresh is older than this (one day) are
+# removed by the eviction sweep; until then they stay on disk to serve the
+# reuse, refresh and If-None-Match fast paths.
+CLONE_EVICT_TTL = 86_400
+
+# A finished job for the same URL, assignment and level is served again
+# for this long (one hour) before the repository is re-analyzed.
+ANALYSIS_REUSE_TTL = 3600
+
+# File suffixes (without the dot) considered code worth reviewing; checked
+# with str.rpartition + an O(1) set lookup per directory entry. Add more as
+# needed.
+CODE_SUFFIXES = frozenset({'py', 'js', 'vim', 'java', 'cpp', 'c'})
+
+# Bound on the discovery queue, so a huge repository cannot pile every
+# path into memory before the first analysis even starts.
+FILE_QUEUE_SIZE = 64
+
+# Files above this size are never sent for analysis; they are almost
+# always generated or vendored code and would blow the context window.
+MAX_FILE_BYTES = 512 * 1024
+
+# Window size and overlap (in characters) used to split a file that is
+# too large for one request but still worth reviewing. The overlap keeps
+# context across the cut so a function split mid-body is seen whole once.
+CHUNK_CHARS = 16_000
+CHUNK_OVERLAP = 2_000
+
+# Retry policy for OpenAI API requests: attempts, exponential backoff
+# base/cap in seconds, and the status codes worth retrying at all.
+MAX_API_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+# Strong references to in-flight background tasks (analysis jobs, deferred
+# cleanups); the event loop only keeps weak ones, so without this a running
+# task could be garbage-collected.
+_background_tasks = set()
+
+# Per-job queues of connected stream watchers. Each finished file's result
+# is pushed to every queue; None marks the end of the job's stream.
+_job_subscribers = {}
+
+# The explicitly sized thread pool backing `asyncio.to_thread` and aiofiles,
+# created on first use by `ensure_default_executor`.
+_io_executor = None
+
+
+def ensure_default_executor():
+    """
+    Install an explicitly sized thread pool as the running loop's default executor.
+
+    Everything offloaded with `asyncio.to_thread` (the directory walk, the
+    eviction sweep, and aiofiles' reads) otherwise shares the implicit default
+    pool of only `min(32, cpu + 4)` threads, a hidden concurrency cap for
+    pure-I/O fanout. This runs lazily at the start of each analysis rather
+    than from an app startup hook, because the server (daphne) creates its
+    serving loop after app setup — installing the executor at startup would
+    target a loop that never runs. The pool is created once and shared; the
+    size can be tuned with the `THREAD_POOL_SIZE` environment variable
+    (default 64).
+    """
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("THREAD_POOL_SIZE", 64)),
+            thread_name_prefix="analyzer-io"
+        )
+    asyncio.get_running_loop().set_default_executor(_io_executor)
+
+
+def publish_result(job_id: int, result):
+    """
+    Push one per-file result (or the None end-marker) to a job's watchers.
+
+    Args:
+        job_id (int): The primary key of the job the result belongs to.
+        result (dict | None): The per-file result, or None when the job is over.
+    """
+    for queue in _job_subscribers.get(job_id, []):
+        queue.put_nowait(result)
+
 
 async def home(request):
     """
     Handle the home page view for submitting a repository URL and analyzing it.
 
     This view processes both GET and POST requests:
-    - For GET requests, it renders a form for users to input a repository URL, 
+    - For GET requests, it renders a form for users to input a repository URL,
       assignment description, and candidate level.
-    - For POST requests, it validates the form input, retrieves the data, 
-      and asynchronously calls the repository analysis function.
+    - For POST requests, it validates the form input, records a `Job` row, and
+      schedules the repository analysis as a background task, so the request
+      returns immediately instead of holding the connection (and a worker slot)
+      open for the whole clone-and-analyze run. The user lands on a waiting
+      page that streams results as they finish. A submission identical to a job
+      that
+      finished within the last `ANALYSIS_REUSE_TTL` seconds is answered
+      straight from that job's stored results.
 
     Args:
         request (HttpRequest): The HTTP request object containing metadata about the request.
 
     Returns:
-        HttpResponse: Renders the results template with the analysis recommendations if the form is valid.
+        HttpResponse: Renders the waiting page for the scheduled job if the form is valid.
         Otherwise, it renders the home page with the form.
     """
     if request.method == "POST":
         form = RepositoryForm(request.POST)
         if form.is_valid():
-            repository_url = form.cleaned_data['url']
-            assignment_description = form.cleaned_data['assignment_description']
-            candidate_level = form.cleaned_data['candidate_level']
+            # A duplicate submission within the reuse window is answered from
+            # the stored results of the earlier run — one DB query, no clone.
+            cutoff = timezone.now() - timezone.timedelta(seconds=ANALYSIS_REUSE_TTL)
+            recent = await Job.objects.filter(
+                repository_url=form.cleaned_data['url'],
+                assignment_description=form.cleaned_data['assignment_description'],
+                candidate_level=form.cleaned_data['candidate_level'],
+                status=Job.DONE,
+                updated_at__gte=cutoff,
+            ).order_by('-updated_at').afirst()
+            if recent is not None:
+                return render(request, 'analyzer/results.html', {'recommendations': recent.result})
+
+            job = await Job.objects.acreate(
+                repository_url=form.cleaned_data['url'],
+                assignment_description=form.cleaned_data['assignment_description'],
+                candidate_level=form.cleaned_data['candidate_level'],
+            )
 
-            recommendations = await analyze_repository(repository_url, assignment_description, candidate_level)
+            task = asyncio.create_task(run_analysis_job(job.pk))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
 
-            return render(request, 'analyzer/results.html', {'recommendations': recommendations})
+            return render(request, 'analyzer/waiting.html', {'job': job})
     else:
         form = RepositoryForm()
 
     return render(request, 'analyzer/home.html', {'form': form})
 
 
-async def analyze_repository(repo_url: str, assignment_description: str, candidate_level: str) -> str:
+async def run_analysis_job(job_id: int):
+    """
+    Execute one queued analysis job and record its outcome.
+
+    Marks the job as running, performs the full repository analysis, and stores
+    the per-file results on the job when it succeeds. Any exception marks the
+    job as failed (with the error logged) rather than propagating into the
+    event loop.
+
+    Args:
+        job_id (int): The primary key of the `Job` row to execute.
+    """
+    job = await Job.objects.aget(pk=job_id)
+    job.status = Job.RUNNING
+    await job.asave(update_fields=['status', 'updated_at'])
+
+    try:
+        results = await analyze_repository(
+            job.repository_url, job.assignment_description, job.candidate_level,
+            job_id=job.pk
+        )
+    except Exception as e:
+        logging.error("Analysis job %d failed: %s", job_id, e)
+        logging.error("Traceback: %s", traceback.format_exc())
+        job.status = Job.FAILED
+    else:
+        job.result = results
+        job.status = Job.DONE
+
+    await job.asave(update_fields=['status', 'result', 'updated_at'])
+    publish_result(job_id, None)
+
+
+async def job_stream(request, job_id: int):
+    """
+    Stream a job's per-file results to the client as server-sent events.
+
+    Each analyzed file is pushed as a `data:` event the moment its review
+    completes, so the first result reaches the browser after one API reply
+    instead of after the whole repository. A final `done` event closes the
+    stream; a client connecting after the job finished just gets the stored
+    results followed by `done`.
+
+    Args:
+        request (HttpRequest): The HTTP request object containing metadata about the request.
+        job_id (int): The primary key of the `Job` row to stream.
+
+    Returns:
+        StreamingHttpResponse: A `text/event-stream` response of per-file results.
+
+    Raises:
+        Http404: If no job with the given id exists.
+    """
+    await aget_object_or_404(Job, pk=job_id)
+    queue = asyncio.Queue()
+    subscribers = _job_subscribers.setdefault(job_id, [])
+    subscribers.append(queue)
+
+    async def event_stream():
+        try:
+            job = await Job.objects.aget(pk=job_id)
+            if job.status in (Job.DONE, Job.FAILED):
+                for result in job.result or []:
+                    yield f"data: {json.dumps(result)}\n\n"
+            else:
+                while (result := await queue.get()) is not None:
+                    yield f"data: {json.dumps(result)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            subscribers.remove(queue)
+            if not subscribers:
+                _job_subscribers.pop(job_id, None)
+
+    return StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+
+
+async def job_results(request, job_id: int):
+    """
+    Render the analysis results of a finished job.
+
+    While the job is still pending or running, the user is sent back to the
+    waiting page instead.
+
+    Args:
+        request (HttpRequest): The HTTP request object containing metadata about the request.
+        job_id (int): The primary key of the `Job` row whose results to show.
+
+    Returns:
+        HttpResponse: The results template with the job's recommendations, or a
+        redirect to the waiting flow for unfinished jobs.
+
+    Raises:
+        Http404: If no job with the given id exists.
+    """
+    job = await aget_object_or_404(Job, pk=job_id)
+    if job.status in (Job.PENDING, Job.RUNNING):
+        return render(request, 'analyzer/waiting.html', {'job': job})
+    return render(request, 'analyzer/results.html', {'recommendations': job.result})
+
+
+async def analyze_repository(repo_url: str, assignment_description: str, candidate_level: str,
+                             job_id: int = None) -> str:
     """
     Asynchronously clone a repository, analyze the code files, and return analysis results.
 
     This function performs the following steps:
     1. Clones the GitHub repository from the provided URL to a local temporary directory.
-    2. Retrieves all relevant code files from the repository.
-    3. Reads each file asynchronously, sending the code to the OpenAI API for analysis.
-    4. Gathers the analysis results for each file.
-    5. Cleans up by deleting the cloned repository from the local filesystem.
+    2. Streams discovered code files through a bounded queue into a pool of
+       workers, so analysis starts before the directory walk has finished.
+    3. Each worker reads its files asynchronously, serves already-reviewed
+       content from the cache, and packs the rest into shared batches so one
+       OpenAI request reviews several files at once.
+    4. Waits for the producer and all workers, collecting per-file results.
+    5. Schedules a sweep that evicts checkouts idle for `CLONE_EVICT_TTL`;
+       the one just analyzed stays on disk to serve the reuse and refresh
+       fast paths for repeat submissions.
+    6. Persists the run as Repository/Analysis rows for later retrieval.
 
     Args:
         repo_url (str): The URL of the GitHub repository to be cloned and analyzed.
         assignment_description (str): A description of the coding assignment for context.
         candidate_level (str): The experience level of the candidate (e.g., Junior, Middle, Senior).
+        job_id (int, optional): When running as a job, each per-file result is
+            also streamed to the job's connected watchers as it completes.
 
     Returns:
         str: A list of dictionaries where each dictionary contains the file path and its corresponding analysis result.
     """
-    local_repo_path = clone_repository(repo_url)
+    ensure_default_executor()
 
-    code_files = get_all_python_files(local_repo_path)
+    local_repo_path = await clone_repository(repo_url)
+
+    # Built once and sent byte-identical with every request in the run, so
+    # the provider's prompt cache can reuse the shared prefix; only the code
+    # varies per call.
+    system_prompt = build_system_prompt(assignment_description, candidate_level)
 
     analysis_results = []
-    for code_file in code_files:
-        code_content = await read_file(code_file)
-        analysis = await get_code_analysis(code_content, assignment_description, candidate_level)
-        analysis_results.append({code_file: analysis})
 
-    cleanup_repository(local_repo_path)
+    # Identical file contents (vendored copies, generated stubs, empty
+    # __init__.py files) are analyzed once per run: the first path to claim a
+    # content digest becomes its representative, later paths wait on it, and
+    # the representative's result is fanned out to all of them when recorded.
+    digest_by_path = {}
+    completed_digests = {}
+    pending_duplicates = {}
+
+    def record(result: dict):
+        analysis_results.append(result)
+        if job_id is not None:
+            publish_result(job_id, result)
+        path, analysis = next(iter(result.items()))
+        digest = digest_by_path.pop(path, None)
+        if digest is not None:
+            completed_digests[digest] = analysis
+            for duplicate in pending_duplicates.pop(digest, []):
+                record({duplicate: analysis})
+
+    def claim(code_file: str, content: str) -> bool:
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        if digest in completed_digests:
+            record({code_file: completed_digests[digest]})
+            return False
+        if digest in pending_duplicates:
+            pending_duplicates[digest].append(code_file)
+            return False
+        pending_duplicates[digest] = []
+        digest_by_path[code_file] = digest
+        return True
+
+    queue = asyncio.Queue(maxsize=FILE_QUEUE_SIZE)
+
+    limits = httpx.Limits(
+        max_connections=MAX_CONCURRENT_ANALYSES,
+        max_keepalive_connections=MAX_CONCURRENT_ANALYSES
+    )
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        producer = asyncio.create_task(
+            produce_code_files(local_repo_path, queue, MAX_CONCURRENT_ANALYSES)
+        )
+        workers = [
+            asyncio.create_task(
+                analysis_worker(client, queue, system_prompt, record, claim)
+            )
+            for _ in range(MAX_CONCURRENT_ANALYSES)
+        ]
+        await asyncio.gather(producer, *workers)
+
+    schedule_checkout_eviction()
+
+    repository, _ = await Repository.objects.aget_or_create(url=repo_url)
+    await Analysis.objects.abulk_create([
+        Analysis(repository=repository, recommendations=json.dumps(result))
+        for result in analysis_results
+    ])
 
     return analysis_results
 
 
-def clone_repository(repo_url: str) -> str:
+async def produce_code_files(repo_path: str, queue: asyncio.Queue, num_workers: int):
+    """
+    Feed discovered code file paths into the analysis queue.
+
+    The `iter_code_files` walk runs in a thread (in chunks, to keep the
+    per-entry overhead low) so the event loop stays free while directories
+    are scanned, and each discovered path is put on the bounded queue as
+    soon as it is found. One `None` sentinel per worker is enqueued at the
+    end to signal shutdown.
+
+    Args:
+        repo_path (str): The local file system path to the cloned repository.
+        queue (asyncio.Queue): The queue consumed by the analysis workers.
+        num_workers (int): How many workers need a shutdown sentinel.
+    """
+    files = iter_code_files(repo_path)
+    while chunk := await asyncio.to_thread(lambda: list(itertools.islice(files, FILE_QUEUE_SIZE))):
+        for code_file in chunk:
+            await queue.put(code_file)
+    for _ in range(num_workers):
+        await queue.put(None)
+
+
+async def analysis_worker(client: httpx.AsyncClient, queue: asyncio.Queue,
+                          system_prompt: str, record, claim):
+    """
+    Consume file paths from the queue and analyze them in batches.
+
+    Each worker reads a file as soon as the producer discovers it, serves it
+    from the cache when its exact content was already reviewed, hands in-run
+    duplicates over to their representative via `claim`, and otherwise
+    accumulates it into a batch. A batch is sent to the OpenAI API once adding
+    the next file would exceed `BATCH_CHAR_BUDGET`; whatever remains is flushed
+    when the shutdown sentinel arrives. Files above `MAX_FILE_BYTES` are skipped
+    with a note (without ever being read), and files too large for one request
+    but under that limit are reviewed in overlapping chunks. Running one such
+    loop per worker bounds the number of in-flight API requests without a
+    separate semaphore.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client used for API requests.
+        queue (asyncio.Queue): The queue of file paths fed by the producer.
+        system_prompt (str): The run-wide system message carrying the assignment context.
+        record (Callable[[dict], None]): Called with each per-file result as it completes.
+        claim (Callable[[str, str], bool]): Registers a file's content digest for the
+            run; returns False when another path already covers the same content.
+    """
+    batch, batch_size = [], 0
+
+    async def flush_batch():
+        nonlocal batch, batch_size
+        if not batch:
+            return
+        current, batch, batch_size = batch, [], 0
+        await analyze_batch(client, current, system_prompt, record)
+
+    while (item := await queue.get()) is not None:
+        code_file, file_size = item
+
+        if file_size > MAX_FILE_BYTES:
+            logging.info("Skipping %s: %d bytes exceeds the %d-byte analysis limit",
+                         code_file, file_size, MAX_FILE_BYTES)
+            record(
+                {code_file: f"Skipped analysis: file is larger than {MAX_FILE_BYTES} bytes."}
+            )
+            continue
+
+        try:
+            content = await read_file(code_file)
+        except OSError as e:
+            logging.error("Could not read %s: %s", code_file, e)
+            record({code_file: "Error analyzing code: file could not be read."})
+            continue
+
+        # Serve files whose exact content was already reviewed (same assignment,
+        # level and model) straight from the cache; only the rest hit the API.
+        cached = await cache.aget(analysis_cache_key(content, system_prompt))
+        if cached is not None:
+            record({code_file: cached})
+            continue
+
+        if not claim(code_file, content):
+            continue
+
+        if len(content) > BATCH_CHAR_BUDGET:
+            analysis = await analyze_file_in_chunks(client, content, system_prompt)
+            record({code_file: analysis})
+            continue
+
+        if batch and batch_size + len(content) > BATCH_CHAR_BUDGET:
+            await flush_batch()
+        batch.append((code_file, content))
+        batch_size += len(content)
+
+    await flush_batch()
+
+
+async def analyze_batch(client: httpx.AsyncClient, batch: list[tuple[str, str]],
+                        system_prompt: str, record):
+    """
+    Analyze one batch of files and record the per-file results.
+
+    Single-file batches go through `get_code_analysis`; larger ones through
+    `get_batch_code_analysis`. Successful analyses are cached under their
+    content hash so identical files are never paid for twice, while error
+    strings are left uncached so the next run retries them.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client used for API requests.
+        batch (list[tuple[str, str]]): Pairs of file path and file content to review.
+        system_prompt (str): The run-wide system message carrying the assignment context.
+        record (Callable[[dict], None]): Called with each per-file result as it completes.
+    """
+    try:
+        if len(batch) == 1:
+            code_file, content = batch[0]
+            result = {code_file: await get_code_analysis(client, content, system_prompt)}
+        else:
+            result = await get_batch_code_analysis(client, batch, system_prompt)
+    except Exception as e:
+        logging.error("Analysis failed for batch %s: %s", [path for path, _ in batch], e)
+        for code_file, _ in batch:
+            record({code_file: "Error analyzing code due to an unexpected error."})
+        return
+
+    for code_file, content in batch:
+        analysis = result[code_file]
+        record({code_file: analysis})
+        if not analysis.startswith("Error analyzing code"):
+            await cache.aset(
+                analysis_cache_key(content, system_prompt),
+                analysis,
+                timeout=ANALYSIS_CACHE_TTL
+            )
+
+
+async def analyze_file_in_chunks(client: httpx.AsyncClient, content: str,
+                                 system_prompt: str) -> str:
+    """
+    Analyze a file too large for a single request by splitting it into windows.
+
+    The content is cut into `CHUNK_CHARS`-sized windows that overlap by
+    `CHUNK_OVERLAP` characters, so code split at a window boundary still
+    appears whole in one of them. The windows are analyzed concurrently and
+    the per-part reviews are joined into a single labeled result. The combined
+    result is cached under the content hash only when every window succeeded —
+    the `[Part i of N]` labels would otherwise hide a part's error string from
+    the caller, and error strings must stay uncached so the next run retries
+    them, same as on the batch path.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client used for API requests.
+        content (str): The full file content to analyze.
+        system_prompt (str): The run-wide system message carrying the assignment context.
+
+    Returns:
+        str: The combined analysis of all windows, one labeled section per part.
+    """
+    chunks = []
+    step = CHUNK_CHARS - CHUNK_OVERLAP
+    for start in range(0, len(content), step):
+        chunks.append(content[start:start + CHUNK_CHARS])
+        if start + CHUNK_CHARS >= len(content):
+            break
+
+    parts = await asyncio.gather(
+        *(get_code_analysis(client, chunk, system_prompt) for chunk in chunks)
+    )
+    if len(parts) == 1:
+        analysis = parts[0]
+    else:
+        analysis = "\n\n".join(
+            f"[Part {i} of {len(parts)}]\n{part}" for i, part in enumerate(parts, start=1)
+        )
+
+    if not any(part.startswith("Error analyzing code") for part in parts):
+        await cache.aset(
+            analysis_cache_key(content, system_prompt),
+            analysis,
+            timeout=ANALYSIS_CACHE_TTL
+        )
+    return analysis
+
+
+def build_system_prompt(assignment_description: str, candidate_level: str) -> str:
     """
-    Clone a GitHub repository to a temporary local directory.
+    Build the constant system message shared by every request in a run.
 
-    This function takes a GitHub repository URL, clones it to the `/tmp/` directory,
-    and returns the path to the local clone. If the repository has already been cloned
-    to the specified location, it skips the cloning step and logs that the repository
-    already exists.
+    Keeping this prefix byte-identical across all of a run's calls lets the
+    provider's prompt cache reuse it, and avoids re-sending the assignment
+    context inside every user message.
 
     Args:
-        repo_url (str): The URL of the GitHub repository to be cloned.
+        assignment_description (str): A description of the coding assignment.
+        candidate_level (str): The experience level of the candidate.
 
     Returns:
-        str: The local file system path where the repository has been cloned.
+        str: The system message content.
+    """
+    return (
+        f"You review code submitted for a coding assignment and point out "
+        f"strengths, problems and concrete improvements.\n"
+        f"Assignment Description: {assignment_description}\n"
+        f"Candidate Level: {candidate_level}"
+    )
+
+
+def analysis_cache_key(content: str, system_prompt: str) -> str:
     """
-    repo_name = repo_url.split("/")[-1].replace('.git', '')
-    local_path = f"/tmp/{repo_name}"
+    Build the cache key under which a file's analysis result is stored.
+
+    The key is a SHA-256 over the file content together with everything else
+    that shapes the model's answer (the system prompt, which carries the
+    assignment description and candidate level, and the model name), so a hit
+    is only possible when the reply would be identical anyway.
+
+    Args:
+        content (str): The file content that was analyzed.
+        system_prompt (str): The system message the content was reviewed under.
+
+    Returns:
+        str: The cache key for this (content, prompt context) combination.
+    """
+    fingerprint = "|".join((content, system_prompt, OPENAI_MODEL))
+    return "analysis:" + hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+async def clone_repository(repo_url: str) -> str:
+    """
+    Fetch a repository's working tree into a local checkout under `CLONE_ROOT`.
+
+    Only the latest working tree is ever analyzed, so for github.com URLs the
+    repository is fetched as a HEAD tarball from codeload and unpacked — no
+    pack history, no git object resolution, several times fewer bytes on the
+    wire than even a shallow clone. Other URLs fall back to an async `git`
+    subprocess with `--depth=1 --filter=blob:none --single-branch`, so the
+    event loop keeps serving other requests meanwhile. An existing checkout is
+    reused as-is while its freshness marker (`.git/HEAD`, or the tarball stamp
+    file) is younger than `CLONE_REUSE_TTL`; past that it is refreshed — a
+    conditional tarball download (`If-None-Match`) or a shallow fetch + hard
+    reset — so a stale checkout from an earlier run can no longer serve
+    outdated code. A leftover directory that is neither is replaced from
+    scratch.
+
+    Anything that mutates the shared checkout runs under a cache-level
+    lock keyed on the checkout name: two requests submitting the same URL
+    at once would otherwise both race into the download against the same
+    directory and corrupt it. The first request to add the lock key does the
+    work; the others wait on it and reuse the finished checkout.
+
+    Args:
+        repo_url (str): The URL of the repository to be fetched.
+
+    Returns:
+        str: The local file system path where the working tree has been placed.
+
+    Raises:
+        RuntimeError: If a git command fails or does not finish within the timeout.
+        httpx.HTTPStatusError: If the tarball download is refused.
+    """
+    checkout = checkout_name(repo_url)
+    local_path = os.path.join(CLONE_ROOT, checkout)
+    head_path = os.path.join(local_path, '.git', 'HEAD')
+    stamp_path = os.path.join(local_path, '.tarball-stamp')
+    os.makedirs(CLONE_ROOT, exist_ok=True)
+
+    if clone_is_fresh(head_path) or clone_is_fresh(stamp_path):
+        logging.info(f"Reusing fresh checkout at {local_path}")
+        return local_path
+
+    lock_key = f"clone-lock:{checkout}"
+    while not await cache.aadd(lock_key, "1", CLONE_LOCK_TTL):
+        # Another request holds the lock; wait for it and reuse its checkout.
+        await asyncio.sleep(CLONE_LOCK_POLL)
+        if clone_is_fresh(head_path) or clone_is_fresh(stamp_path):
+            logging.info(f"Reusing checkout from a concurrent request at {local_path}")
+            return local_path
+
+    try:
+        # Re-check under the lock: the previous holder may have refreshed
+        # the checkout between our freshness check and acquiring the lock.
+        if clone_is_fresh(head_path) or clone_is_fresh(stamp_path):
+            logging.info(f"Reusing fresh checkout at {local_path}")
+            return local_path
+
+        tarball_url = github_tarball_url(repo_url)
+        if tarball_url is not None:
+            await download_tarball(tarball_url, local_path, stamp_path)
+            return local_path
+
+        if os.path.exists(head_path):
+            logging.info(f"Refreshing stale clone at {local_path}")
+            await run_git("-C", local_path, "fetch", "--depth=1", "origin", "HEAD")
+            await run_git("-C", local_path, "reset", "--hard", "FETCH_HEAD")
+            os.utime(head_path)  # restart the reuse window from this refresh
+            return local_path
+
+        if os.path.exists(local_path):
+            logging.warning(f"Removing non-git leftover at {local_path}")
+            await asyncio.to_thread(shutil.rmtree, local_path, ignore_errors=True)
 
-    if not os.path.exists(local_path):
         logging.info(f"Cloning repository to {local_path}")
-        Repo.clone_from(repo_url, local_path)
+        await run_git("clone", "--depth=1", "--filter=blob:none", "--single-branch",
+                      repo_url, local_path)
+        return local_path
+    finally:
+        await cache.adelete(lock_key)
+
+
+def checkout_name(repo_url: str) -> str:
+    """
+    Derive the checkout directory name (and clone-lock key) for a repository.
+
+    Checkouts persist between runs, so the name must identify the repository
+    itself, not just its basename: `alice/utils` and `bob/utils` keyed on the
+    basename alone would share one checkout and each be analyzed against the
+    other's code. A short hash of the normalized URL disambiguates, while the
+    basename prefix keeps the directories recognizable in logs. For GitHub
+    URLs the basename comes from the same parse as the tarball URL; either
+    way the hash suffix guarantees a non-empty name, so no URL (e.g. one
+    with a trailing slash) can ever alias `CLONE_ROOT` itself.
+
+    Args:
+        repo_url (str): The repository URL as submitted by the user.
+
+    Returns:
+        str: A non-empty directory name unique to this repository URL.
+    """
+    normalized = repo_url.rstrip('/').removesuffix('.git')
+    digest = hashlib.sha256(normalized.encode()).hexdigest()[:12]
+    owner_repo = github_owner_repo(repo_url)
+    if owner_repo is not None:
+        basename = owner_repo[1]
     else:
-        logging.info(f"Repository already exists at {local_path}")
+        basename = normalized.rpartition('/')[2]
+    return f"{basename}-{digest}"
+
 
-    return local_path
+def clone_is_fresh(marker_path: str) -> bool:
+    """
+    Report whether a local checkout exists and is still within its reuse window.
+
+    Args:
+        marker_path (str): Path to the checkout's freshness marker — `.git/HEAD`
+            for git clones, the stamp file for unpacked tarballs.
+
+    Returns:
+        bool: True if the marker exists and is younger than `CLONE_REUSE_TTL`
+        seconds.
+    """
+    return (
+        os.path.exists(marker_path)
+        and time.time() - os.path.getmtime(marker_path) < CLONE_REUSE_TTL
+    )
+
+
+def github_owner_repo(repo_url: str):
+    """
+    Parse the owner and repository segments out of a github.com URL.
+
+    This is the one place the owner/repo parse happens: both the tarball URL
+    and the checkout name are derived from it, so they can never disagree
+    about which repository a URL names. Empty path segments (trailing or
+    doubled slashes) are dropped before picking the first two.
+
+    Args:
+        repo_url (str): The repository URL as submitted by the user.
+
+    Returns:
+        tuple[str, str] | None: The (owner, repository) pair, or None when the
+        URL is not a github.com repository.
+    """
+    parsed = urlsplit(repo_url)
+    if parsed.hostname not in ('github.com', 'www.github.com'):
+        return None
+    parts = [part for part in parsed.path.split('/') if part]
+    if len(parts) < 2:
+        return None
+    return parts[0], parts[1].removesuffix('.git')
 
 
-def get_all_python_files(repo_path: str) -> list[str]:
+def github_tarball_url(repo_url: str):
     """
-    Retrieve all relevant code files from a cloned repository.
+    Return the codeload tarball URL for a github.com repository URL.
 
-    This function walks through the file system tree of the cloned repository 
-    and collects all files with specific extensions (e.g., Python, JavaScript, 
-    Java, C++). The collected files are added to a list, which is then returned.
+    Args:
+        repo_url (str): The repository URL as submitted by the user.
+
+    Returns:
+        str | None: The `https://codeload.github.com/.../tar.gz/HEAD` URL, or
+        None when the URL is not a github.com repository and git must be used.
+    """
+    owner_repo = github_owner_repo(repo_url)
+    if owner_repo is None:
+        return None
+    owner, repo = owner_repo
+    return f"https://codeload.github.com/{owner}/{repo}/tar.gz/HEAD"
+
+
+async def download_tarball(tarball_url: str, local_path: str, stamp_path: str):
+    """
+    Download a repository HEAD tarball and unpack it into `local_path`.
+
+    The download streams to a temporary `.tar.gz` next to the checkout with
+    `aiofiles`, so the archive is never held in memory and the event loop is
+    never blocked; unpacking then runs in a worker thread. The response's
+    `ETag` is kept in the stamp file and sent back as `If-None-Match` on the
+    next refresh — when HEAD has not moved, GitHub answers 304 and the
+    existing checkout is kept with its reuse window restarted, without
+    transferring the archive again.
+
+    Args:
+        tarball_url (str): The codeload tarball URL to download.
+        local_path (str): The directory the working tree is unpacked into.
+        stamp_path (str): The freshness-marker file, which stores the ETag.
+
+    Raises:
+        httpx.HTTPStatusError: If the download is refused (e.g. a 404 for a
+            repository that does not exist or is private).
+    """
+    etag = None
+    if os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            etag = f.read().strip() or None
+
+    headers = {'If-None-Match': etag} if etag else {}
+    tar_path = local_path + '.tar.gz'
+    async with httpx.AsyncClient(follow_redirects=True, timeout=CLONE_TIMEOUT) as client:
+        async with client.stream("GET", tarball_url, headers=headers) as response:
+            if response.status_code == 304:
+                logging.info(f"Tarball unchanged upstream, keeping {local_path}")
+                os.utime(stamp_path)  # restart the reuse window
+                return
+            response.raise_for_status()
+            async with aiofiles.open(tar_path, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    await f.write(chunk)
+            etag = response.headers.get('etag', '')
+
+    logging.info(f"Unpacking tarball to {local_path}")
+    try:
+        await asyncio.to_thread(extract_tarball, tar_path, local_path)
+    finally:
+        os.remove(tar_path)
+    with open(stamp_path, 'w') as f:
+        f.write(etag)
+
+
+def extract_tarball(tar_path: str, local_path: str):
+    """
+    Unpack a downloaded repository tarball, replacing `local_path`.
+
+    GitHub tarballs wrap everything in a single `<repo>-<sha>/` directory;
+    that leading component is stripped so the files land directly under
+    `local_path`. Extraction goes into a staging directory first and is
+    swapped in with `os.replace`, so a failed unpack never leaves a
+    half-written checkout behind, and uses the `data` filter so a hostile
+    archive cannot write outside the target.
+
+    Args:
+        tar_path (str): Path to the downloaded `.tar.gz` archive.
+        local_path (str): The directory to place the working tree at.
+    """
+    staging = local_path + '.extract'
+    shutil.rmtree(staging, ignore_errors=True)
+    with tarfile.open(tar_path, 'r:gz') as tar:
+        members = []
+        for member in tar.getmembers():
+            member.name = member.name.partition('/')[2]
+            if member.name:
+                members.append(member)
+        tar.extractall(staging, members=members, filter='data')
+    shutil.rmtree(local_path, ignore_errors=True)
+    os.replace(staging, local_path)
+
+
+async def run_git(*args: str):
+    """
+    Run a git command as an async subprocess, bounded by `CLONE_TIMEOUT`.
+
+    Args:
+        *args (str): The arguments passed to `git`.
+
+    Raises:
+        RuntimeError: If the command exits non-zero or does not finish in time,
+            with git's stderr included in the message.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=CLONE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise RuntimeError(f"git {' '.join(args)} timed out after {CLONE_TIMEOUT}s")
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {stderr.decode(errors='replace').strip()}")
+
+
+def iter_code_files(repo_path: str):
+    """
+    Yield all relevant code files from a cloned repository, with their sizes.
+
+    This generator walks the file system tree of the cloned repository with
+    `os.scandir`, whose `DirEntry` objects carry the file type and size from the
+    directory listing itself — no extra `stat` call per entry, unlike `os.walk`.
+    Files whose suffix is in `CODE_SUFFIXES` (e.g. Python, JavaScript, Java,
+    C++) are yielded as `(path, size)` pairs as they are discovered, so callers
+    can decide how to handle oversized files without touching the disk again.
 
     Args:
         repo_path (str): The local file system path to the cloned repository.
 
     Returns:
-        list[str]: A list of file paths for the relevant code files within the repository.
+        Iterator[tuple[str, int]]: Pairs of file path and size in bytes for the
+        relevant code files within the repository.
     """
-    code_files = []
-    extensions = ('.py', '.js', '.vim', '.java', '.cpp', '.c')  # Add more as needed
-    for root, _, filenames in os.walk(repo_path):
-        for filename in filenames:
-            if filename.endswith(extensions):
-                file_path = os.path.join(root, filename)
-                if os.path.exists(file_path):
-                    code_files.append(file_path)
-                else:
-                    logging.error(f"File not found: {file_path}")
-    return code_files
+    stack = [repo_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            logging.error("Could not scan %s: %s", directory, e)
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and entry.name.rpartition('.')[2] in CODE_SUFFIXES:
+                    yield entry.path, entry.stat(follow_symlinks=False).st_size
 
 
 async def read_file(file_path: str) -> str:
     """
     Asynchronously read the content of a file.
 
-    This function reads the file at the specified `file_path` asynchronously by using the event loop to 
-    execute the file reading operation in a non-blocking way.
+    This function reads the file at the specified `file_path` with `aiofiles`, so the read
+    does not block the event loop and no executor thread is tied up per file.
 
     Args:
         file_path (str): The path to the file to be read.
@@ -145,89 +947,245 @@ async def read_file(file_path: str) -> str:
     Returns:
         str: The content of the file as a string.
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: open(file_path, 'r').read())
+    async with aiofiles.open(file_path, 'r', errors='replace') as f:
+        return await f.read()
+
+
+async def post_chat_completion(client: httpx.AsyncClient, payload: dict) -> str:
+    """
+    Send one chat-completions request to the OpenAI API, with retry logic.
+
+    Transient failures — connect/read timeouts, HTTP 429 and the common 5xx
+    codes — are retried up to `MAX_API_ATTEMPTS` times with exponentially
+    growing, jittered delays (capped at `BACKOFF_CAP` seconds), honoring the
+    server's `Retry-After` header when one is sent. Jitter spreads concurrent
+    retries out so a rate-limit event does not trigger a synchronized stampede.
+    Any other error, or exhaustion of the attempts, propagates to the caller.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client used for the API request.
+        payload (dict): The JSON body of the chat-completions request.
 
+    Returns:
+        str: The content of the model's reply message.
 
-async def get_code_analysis(code: str, assignment_description: str, candidate_level: str) -> str:
+    Raises:
+        httpx.TimeoutException: If the request still times out on the last attempt.
+        httpx.HTTPStatusError: If a non-retryable status is returned, or a
+            retryable one persists through the last attempt.
+    """
+    for attempt in range(MAX_API_ATTEMPTS):
+        try:
+            response = await client.post(
+                'https://api.openai.com/v1/chat/completions',
+                json=payload,
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+            )
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+
+        except (httpx.ConnectTimeout, httpx.ReadTimeout):
+            if attempt == MAX_API_ATTEMPTS - 1:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning("Timeout on attempt %d, retrying in %.1fs...", attempt + 1, delay)
+
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status not in RETRYABLE_STATUS_CODES or attempt == MAX_API_ATTEMPTS - 1:
+                raise
+            try:
+                delay = float(e.response.headers["retry-after"])
+            except (KeyError, ValueError):
+                delay = backoff_delay(attempt)
+            logging.warning("HTTP %d on attempt %d, retrying in %.1fs...", status, attempt + 1, delay)
+
+        await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Compute the jittered exponential backoff delay for a retry attempt.
+
+    Args:
+        attempt (int): The zero-based index of the attempt that just failed.
+
+    Returns:
+        float: Seconds to sleep before the next attempt.
+    """
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+async def get_code_analysis(client: httpx.AsyncClient, code: str, system_prompt: str) -> str:
     """
     Analyze the given code by sending it to the OpenAI API asynchronously, with retry logic.
 
-    This function constructs a prompt using the provided code, assignment description, and candidate level.
-    It then sends the prompt to the OpenAI GPT-4 API for code analysis. The request is made asynchronously 
-    using `httpx` with a retry mechanism that attempts the request up to 3 times in case of a timeout.
+    The assignment context travels in the run-wide system message built by
+    `build_system_prompt`; only the code itself goes in the user message, so the
+    shared prefix is never re-sent per file and stays eligible for the provider's
+    prompt cache. The request goes through `post_chat_completion`, which retries
+    transient failures with jittered exponential backoff. The caller provides the
+    HTTP client so one connection pool (keep-alive and TLS session included) is
+    shared across every file analyzed in a run.
 
     Args:
+        client (httpx.AsyncClient): The shared HTTP client used for the API request.
         code (str): The code to be analyzed.
-        assignment_description (str): A description of the coding assignment to provide context for the analysis.
-        candidate_level (str): The experience level of the candidate (e.g., beginner, intermediate, expert).
+        system_prompt (str): The run-wide system message carrying the assignment context.
 
     Returns:
         str: The analysis result from the OpenAI API, or an error message if the request fails.
 
-    Raises:
-        httpx.ConnectTimeout: If the request times out after 3 attempts.
-        httpx.HTTPStatusError: If an HTTP error occurs, the status code and error response are logged.
-        Exception: For any unexpected errors, the exception and traceback are logged.
-    
     Notes:
-        - Retries the request up to 3 times in case of a connection timeout.
         - Uses GPT-4 model ("gpt-4-turbo") with a token limit and temperature settings for the response.
         - Logs detailed error messages and tracebacks for easier debugging.
     """
+    try:
+        content = await post_chat_completion(client, {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": code}
+            ],
+            "max_tokens": 500,
+            "temperature": 0.5
+        })
+        return content.strip()
+
+    except httpx.TimeoutException:
+        logging.error("Request timed out after %d attempts", MAX_API_ATTEMPTS)
+        return f"Error analyzing code: request timed out after {MAX_API_ATTEMPTS} attempts."
+
+    except httpx.HTTPStatusError as e:
+        logging.error("HTTP error occurred: %s - Status: %d - Response: %s",
+                      e, e.response.status_code, e.response.text)
+        return f"Error analyzing code: HTTP {e.response.status_code}"
+
+    except Exception as e:
+        logging.error("Error analyzing code: %s", str(e))
+        logging.error("Traceback: %s", traceback.format_exc())
+        return "Error analyzing code due to an unexpected error."
+
+
+async def get_batch_code_analysis(client: httpx.AsyncClient, batch: list[tuple[str, str]],
+                                  system_prompt: str) -> dict:
+    """
+    Analyze several files in a single OpenAI API request.
+
+    The files are packed into one prompt as delimited `<FILE path=...>` blocks and the
+    model is asked for a JSON object mapping each path to its review, so one HTTP
+    round-trip (and one copy of the shared prompt prefix) covers the whole batch.
+    If the model's reply cannot be parsed as the expected JSON, the batch falls back
+    to one `get_code_analysis` call per file. Transient API failures are retried by
+    `post_chat_completion` with jittered exponential backoff.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client used for the API request.
+        batch (list[tuple[str, str]]): Pairs of file path and file content to review.
+        system_prompt (str): The run-wide system message carrying the assignment context.
+
+    Returns:
+        dict: A mapping from each file path in the batch to its analysis result
+        (or an error message for that file).
+    """
+    file_blocks = "\n\n".join(
+        f'<FILE path="{path}">\n{content}\n</FILE>' for path, content in batch
+    )
     prompt = (
-        f"Please review the following code in the context of a coding assignment:\n\n"
-        f"Assignment Description: {assignment_description}\n"
-        f"Candidate Level: {candidate_level}\n\n"
-        f"Code:\n{code}\n"
+        f"Review each of the following files separately and return a JSON object "
+        f"mapping each file path to its review.\n\n"
+        f"{file_blocks}\n"
     )
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        for attempt in range(3):  # Retry up to 3 times
-            try:
-                response = await client.post(
-                    'https://api.openai.com/v1/chat/completions',
-                    json={
-                        "model": "gpt-4-turbo",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "max_tokens": 500,
-                        "temperature": 0.5
-                    },
-                    headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
-                )
-                response.raise_for_status()
-                return response.json()['choices'][0]['message']['content'].strip()
+    try:
+        content = await post_chat_completion(client, {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": min(MAX_COMPLETION_TOKENS, 500 * len(batch)),
+            "temperature": 0.5,
+            "response_format": {"type": "json_object"}
+        })
 
-            except httpx.ConnectTimeout:
-                logging.warning(f"Connection timeout on attempt {attempt + 1}, retrying...")
-                if attempt == 2:
-                    return "Error analyzing code: connection timed out after 3 attempts."
+    except httpx.TimeoutException:
+        logging.error("Request timed out after %d attempts", MAX_API_ATTEMPTS)
+        return {path: f"Error analyzing code: request timed out after {MAX_API_ATTEMPTS} attempts."
+                for path, _ in batch}
 
-            except httpx.HTTPStatusError as e:
-                logging.error("HTTP error occurred: %s - Status: %d - Response: %s", 
-                              e, e.response.status_code, e.response.text)
-                return f"Error analyzing code: HTTP {e.response.status_code}"
+    except httpx.HTTPStatusError as e:
+        logging.error("HTTP error occurred: %s - Status: %d - Response: %s",
+                      e, e.response.status_code, e.response.text)
+        return {path: f"Error analyzing code: HTTP {e.response.status_code}" for path, _ in batch}
 
-            except Exception as e:
-                logging.error("Error analyzing code: %s", str(e))
-                logging.error("Traceback: %s", traceback.format_exc())
-                return "Error analyzing code due to an unexpected error."
+    except Exception as e:
+        logging.error("Error analyzing code: %s", str(e))
+        logging.error("Traceback: %s", traceback.format_exc())
+        return {path: "Error analyzing code due to an unexpected error." for path, _ in batch}
 
-            await asyncio.sleep(2)
+    try:
+        reviews = json.loads(content)
+        return {
+            path: str(reviews[path]).strip() if path in reviews
+            else "Error analyzing code: missing from batch response."
+            for path, _ in batch
+        }
+    except (json.JSONDecodeError, TypeError) as e:
+        logging.warning("Unparseable batch response (%s), falling back to per-file analysis", e)
+        return {
+            path: await get_code_analysis(client, content, system_prompt)
+            for path, content in batch
+        }
 
-    return "Error analyzing code: request failed after 3 attempts."
 
+def schedule_checkout_eviction():
+    """
+    Schedule an eviction sweep of old checkouts under `CLONE_ROOT`.
 
-def cleanup_repository(repo_path: str):
+    The sweep runs in a background task on the executor, so neither the event
+    loop nor the finishing analysis waits while working-tree files are
+    unlinked; results reach the user first and stale checkouts disappear
+    shortly after.
     """
-    Delete the cloned repository to clean up temporary files.
+    task = asyncio.create_task(asyncio.to_thread(evict_stale_checkouts))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
-    This function removes the directory at `repo_path` if it exists, effectively cleaning up 
-    any temporary files created during the repository analysis process.
 
-    Args:
-        repo_path (str): The path to the repository directory to be deleted.
+def evict_stale_checkouts():
     """
-    if os.path.exists(repo_path):
-        import shutil
-        shutil.rmtree(repo_path)
+    Remove checkouts whose last clone or refresh is older than `CLONE_EVICT_TTL`.
+
+    Checkouts are deliberately kept between runs so repeat submissions hit the
+    reuse window, the shallow-fetch refresh or the tarball 304 fast path
+    instead of a full download; this sweep is what bounds their disk usage.
+    Each candidate is removed under its clone lock, so an eviction can never
+    race a clone or refresh of the same repository — a checkout currently
+    being (re)fetched is simply skipped and picked up by a later sweep.
+    """
+    try:
+        entries = os.scandir(CLONE_ROOT)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            marker_times = [
+                os.path.getmtime(marker)
+                for marker in (os.path.join(entry.path, '.git', 'HEAD'),
+                               os.path.join(entry.path, '.tarball-stamp'))
+                if os.path.exists(marker)
+            ]
+            last_refreshed = max(marker_times, default=entry.stat(follow_symlinks=False).st_mtime)
+            if time.time() - last_refreshed < CLONE_EVICT_TTL:
+                continue
+            lock_key = f"clone-lock:{entry.name}"
+            if not cache.add(lock_key, "1", CLONE_LOCK_TTL):
+                continue
+            try:
+                logging.info(f"Evicting stale checkout at {entry.path}")
+                shutil.rmtree(entry.path, ignore_errors=True)
+            finally:
+                cache.delete(lock_key)
@@ -28,6 +28,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # makes runserver serve ASGI, so background jobs outlive the request
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -66,6 +67,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'code_analyzer.wsgi.application'
+ASGI_APPLICATION = 'code_analyzer.asgi.application'
 
 
 # Database